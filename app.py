@@ -4,16 +4,26 @@ from flask import Flask, jsonify
 from flask_smorest import Api
 from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
 
 from db import db
 import models
-from models import RevokedTokenModel
+import changes
+from models import RevokedTokenModel, UserModel
+from revocation import RevocationBuffer
+from migration import upgrade_db_command
+from store_documents import rebuild_store_documents_command
+from jobs import worker_command
+from sqlite_tuning import configure_sqlite
+from rate_limit import RateLimiter
 
 from resources.item import blueprint as itemblueprint
 from resources.store import blueprint as storeblueprint
 from resources.tag import blueprint as tagblueprint
 from resources.user import blueprint as userblueprint
+from resources.change import blueprint as changeblueprint
+from resources.job import blueprint as jobblueprint
 
 def create_app(db_url=None):
     app = Flask(__name__)
@@ -28,9 +38,18 @@ def create_app(db_url=None):
     app.config["OPENAPI_SWAGGER_UI_URL"] = "https://cdn.jsdelivr.net/npm/swagger-ui-dist/"
     app.config["SQLALCHEMY_DATABASE_URI"] = db_url or os.getenv("DATABASE_URL", "sqlite:///data.db")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLITE_TUNING"] = os.getenv("SQLITE_TUNING", "1") == "1"
+    app.config["SQLITE_MAINTENANCE_INTERVAL"] = int(os.getenv("SQLITE_MAINTENANCE_INTERVAL", 300))
     db.init_app(app)
 
+    with app.app_context():
+        if app.config["SQLITE_TUNING"] and db.engine.dialect.name == "sqlite":
+            configure_sqlite(db.engine, app.config["SQLITE_MAINTENANCE_INTERVAL"])
+
     migrate = Migrate(app, db)
+    app.cli.add_command(upgrade_db_command)
+    app.cli.add_command(rebuild_store_documents_command)
+    app.cli.add_command(worker_command)
 
     api = Api(app)
 
@@ -38,15 +57,38 @@ def create_app(db_url=None):
     api.register_blueprint(storeblueprint)
     api.register_blueprint(tagblueprint)
     api.register_blueprint(userblueprint)
+    api.register_blueprint(changeblueprint)
+    api.register_blueprint(jobblueprint)
 
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "test")
     jwt = JWTManager(app)
+    revocations = RevocationBuffer(app)
+
+    # Number of reverse proxies in front of the app whose X-Forwarded-* headers
+    # are trusted, so clients get their own rate limit bucket instead of the proxy's.
+    app.config["PROXY_FIX_HOPS"] = int(os.getenv("PROXY_FIX_HOPS") or 0)
+    if app.config["PROXY_FIX_HOPS"]:
+        hops = app.config["PROXY_FIX_HOPS"]
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+
+    app.config["RATE_LIMIT_ENABLED"] = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+    RateLimiter(app)
 
     @jwt.token_in_blocklist_loader
     def check_if_token_in_blacklist(jwt_header, jwt_payload):
-        if RevokedTokenModel.query.filter(RevokedTokenModel.jti == jwt_payload["jti"]).first():
+        if revocations.is_revoked(jwt_payload["jti"]):
+            return True
+
+        # Explicit revocations and the user's token generation in one query.
+        user = db.session.execute(
+            db.select(
+                UserModel.token_generation,
+                db.select(RevokedTokenModel.id).where(RevokedTokenModel.jti == jwt_payload["jti"]).exists().label("revoked")
+            ).where(UserModel.id == jwt_payload["sub"])
+        ).first()
+        if user is None or user.revoked:
             return True
-        return False
+        return jwt_payload.get("gen", 0) < user.token_generation
 
     @jwt.revoked_token_loader
     def revoked_token_callback(jwt_header, jwt_payload):
@@ -0,0 +1,103 @@
+"""Multi-process read/write throughput against a SQLite database.
+
+Runs the same mixed workload with and without SQLite tuning, e.g.
+
+    python benchmarks/sqlite_concurrency.py --workers 8 --writers 2 --seconds 10
+
+Each worker process builds its own app, like a gunicorn worker. Writers
+POST /item and readers GET /item/<id>; failed requests (typically
+"database is locked") are counted as errors.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _app(path, tuned):
+    os.environ["SQLITE_TUNING"] = "1" if tuned else "0"
+    os.environ["RATE_LIMIT_ENABLED"] = "0"
+    from app import create_app
+
+    return create_app(f"sqlite:///{path}")
+
+
+def _setup(path, tuned):
+    from db import db
+    from models import StoreModel, UserModel
+
+    app = _app(path, tuned)
+    with app.app_context():
+        db.create_all()
+        db.session.add(UserModel(username="bench", password="-"))
+        db.session.add(StoreModel(name="bench"))
+        db.session.commit()
+
+
+def _work(path, tuned, index, writer, seconds, results):
+    from flask_jwt_extended import create_access_token
+
+    app = _app(path, tuned)
+    with app.app_context():
+        headers = {"Authorization": f"Bearer {create_access_token(identity=1, fresh=True)}"}
+    client = app.test_client()
+
+    ops = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            if writer:
+                response = client.post(
+                    "/item", json={"name": f"item-{index}-{ops}", "price": 1, "store_id": 1}, headers=headers
+                )
+            else:
+                response = client.get(f"/item/{ops % 50 + 1}", headers=headers)
+            if response.status_code >= 500:
+                errors += 1
+            else:
+                ops += 1
+        except Exception:
+            errors += 1
+    results.put((writer, ops, errors))
+
+
+def run(tuned, workers, writers, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        _setup(path, tuned)
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=_work, args=(path, tuned, index, index < writers, seconds, results))
+            for index in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        totals = {True: [0, 0], False: [0, 0]}
+        for _ in processes:
+            writer, ops, errors = results.get()
+            totals[writer][0] += ops
+            totals[writer][1] += errors
+        for process in processes:
+            process.join()
+
+    label = "tuned" if tuned else "default"
+    print(
+        f"{label:>8}: writes {totals[True][0] / seconds:8.1f}/s ({totals[True][1]} errors), "
+        f"reads {totals[False][0] / seconds:8.1f}/s ({totals[False][1]} errors)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    for tuned in (False, True):
+        run(tuned, args.workers, args.writers, args.seconds)
@@ -0,0 +1,163 @@
+import threading
+import time
+import zlib
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm import Session
+
+from db import db
+from models import ChangeModel, ItemModel, StoreModel, TagModel
+from store_documents import apply_store_changes
+
+
+POLL_INTERVAL = 1.0
+BATCH_SIZE = 500
+LOCK_KEY = zlib.crc32(b"flaskrestapi-changes")
+
+
+def _scope(obj):
+    if isinstance(obj, StoreModel):
+        return "store", obj.id
+    if isinstance(obj, ItemModel):
+        return "item", obj.store_id
+    if isinstance(obj, TagModel):
+        return "tag", obj.store_id
+    return None, None
+
+
+def _link_changes(obj, deleted=False):
+    """Yield tag link changes from the item/tag collections of a flushed object.
+
+    All links of a deleted object go with it. The flush loads them to delete
+    their rows, so they are still in the collection's history.
+    """
+    if isinstance(obj, ItemModel):
+        history = inspect(obj).attrs["tags"].history
+        pairs = lambda tags: ((obj, tag) for tag in tags)
+    elif isinstance(obj, TagModel):
+        history = inspect(obj).attrs["items"].history
+        pairs = lambda items: ((item, obj) for item in items)
+    else:
+        return
+    if deleted:
+        for item, tag in pairs(history.non_added()):
+            yield "delete", item, tag
+        return
+    for item, tag in pairs(history.added or ()):
+        yield "create", item, tag
+    for item, tag in pairs(history.deleted or ()):
+        yield "delete", item, tag
+
+
+def _change(entity, entity_id, action, store_id=None, related_id=None):
+    return {
+        "entity": entity,
+        "entity_id": entity_id,
+        "related_id": related_id,
+        "store_id": store_id,
+        "action": action,
+    }
+
+
+def _lock_change_log(connection, info):
+    """Make change IDs become visible in commit order.
+
+    Readers resume from the highest ID they have seen, so ID N+1 must never
+    commit before N. On PostgreSQL, writers take a transaction-level advisory
+    lock before allocating IDs and keep it until commit or rollback, so
+    their transactions finish in ID order. This serializes the end of
+    catalog write transactions. SQLite allows one writer at a time, which
+    already gives the same guarantee.
+    """
+    if connection.dialect.name == "postgresql" and not info.get("change_log_locked"):
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+        info["change_log_locked"] = True
+
+
+def record_change(entity, entity_id, action, store_id=None, related_id=None):
+    """Append a change for writes that bypass the unit of work, e.g. upserts."""
+    change = _change(entity, entity_id, action, store_id, related_id)
+    _lock_change_log(db.session.connection(), db.session.info)
+    db.session.execute(db.insert(ChangeModel).values(**change))
+    apply_store_changes(db.session.connection(), [change])
+    db.session.info["changes_pending"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed_changes(session, flush_context):
+    rows = []
+    links = set()
+    for action, objects in (("create", session.new), ("update", session.dirty), ("delete", session.deleted)):
+        for obj in objects:
+            entity, store_id = _scope(obj)
+            if entity is None:
+                continue
+            if action != "update" or session.is_modified(obj, include_collections=False):
+                rows.append(_change(entity, obj.id, action, store_id))
+            for link_action, item, tag in _link_changes(obj, deleted=action == "delete"):
+                links.add((link_action, item.id, tag.id, item.store_id))
+
+    for action, item_id, tag_id, store_id in sorted(links):
+        rows.append(_change("tag_item", item_id, action, store_id, tag_id))
+
+    if rows:
+        # Written on the flush's connection so they commit with the change itself.
+        _lock_change_log(session.connection(), session.info)
+        session.connection().execute(ChangeModel.__table__.insert(), rows)
+        apply_store_changes(session.connection(), rows)
+        session.info["changes_pending"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_committed_changes(session):
+    session.info.pop("change_log_locked", None)
+    if session.info.pop("changes_pending", False):
+        feed.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_changes(session):
+    session.info.pop("change_log_locked", None)
+    session.info.pop("changes_pending", None)
+
+
+class ChangeFeed:
+    """Reads the change log after a cursor, waiting for new entries.
+
+    Commits in this worker wake waiters immediately; changes committed by
+    other workers are picked up every ``POLL_INTERVAL`` seconds.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+
+    def notify(self):
+        with self._condition:
+            self._condition.notify_all()
+
+    def head(self):
+        cursor = db.session.scalar(db.select(db.func.max(ChangeModel.id)))
+        db.session.rollback()
+        return cursor or 0
+
+    def read(self, since, store_id=None):
+        query = db.select(*ChangeModel.__table__.c).where(ChangeModel.id > since)
+        if store_id is not None:
+            query = query.where(ChangeModel.store_id == store_id)
+        changes = db.session.execute(query.order_by(ChangeModel.id).limit(BATCH_SIZE)).mappings().all()
+        # Don't hold a transaction open while waiting between polls.
+        db.session.rollback()
+        return changes
+
+    def wait(self, since, timeout, store_id=None):
+        deadline = time.monotonic() + timeout
+        while True:
+            changes = self.read(since, store_id)
+            remaining = deadline - time.monotonic()
+            if changes or remaining <= 0:
+                return changes
+            with self._condition:
+                self._condition.wait(min(POLL_INTERVAL, remaining))
+
+
+feed = ChangeFeed()
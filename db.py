@@ -1,3 +1,17 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql, sqlite
 
 db = SQLAlchemy()
+
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def upsert_insert(model, bind=None):
+    """Return an INSERT construct supporting ON CONFLICT for the current dialect."""
+    dialect = (bind or db.session.get_bind()).dialect.name
+    if dialect not in _UPSERT_INSERTS:
+        raise NotImplementedError(f"ON CONFLICT upserts are not supported on {dialect}.")
+    return _UPSERT_INSERTS[dialect](model)
@@ -1,5 +1,8 @@
 #!/bin/sh
 
-flask db upgrade
+flask upgrade-db
 
-exec gunicorn --bind 0.0.0.0:80 "app:create_app()"
+# Threaded workers, so /changes long-polls and streams hold a thread rather than a whole worker.
+# Each worker serves at most 6 of them at once (MAX_WAITERS in resources/change.py),
+# so set WEB_CONCURRENCY to the number of workers needed for the expected subscribers.
+exec gunicorn --workers "${WEB_CONCURRENCY:-2}" --worker-class gthread --threads 8 --bind 0.0.0.0:80 "app:create_app()"
@@ -0,0 +1,307 @@
+import json
+import logging
+import os
+import signal
+import socket
+import threading
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from db import db
+from changes import record_change
+from models import JobModel, ItemModel, StoreModel, TagModel, TagItemModel
+from schemas import DeleteStoreJobSchema, TagItemsJobSchema, ImportItemsJobSchema
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+LEASE = timedelta(minutes=10)
+
+handlers = {}
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def job_handler(kind, schema, max_running=None):
+    """Register a function running jobs of ``kind``.
+
+    ``schema`` validates the payload when the job is enqueued and
+    ``max_running`` caps how many jobs of this kind run at once.
+    """
+    def decorator(func):
+        handlers[kind] = {"func": func, "schema": schema, "max_running": max_running}
+        return func
+    return decorator
+
+
+def enqueue(kind, payload, max_attempts=3):
+    now = _now()
+    job = JobModel(
+        kind=kind,
+        payload=json.dumps(payload),
+        max_attempts=max_attempts,
+        run_after=now,
+        created_at=now,
+        updated_at=now
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def _update_job(job_id, **values):
+    # Status updates use their own transaction, separate from the job's work.
+    with db.engine.begin() as connection:
+        connection.execute(
+            db.update(JobModel).where(JobModel.id == job_id).values(updated_at=_now(), **values)
+        )
+
+
+class JobContext:
+    def __init__(self, job_id):
+        self.id = job_id
+
+    def progress(self, done, total=None):
+        """Report progress. Commit the job's work before calling this."""
+        values = {"progress_done": done}
+        if total is not None:
+            values["progress_total"] = total
+        _update_job(self.id, **values)
+
+
+def _lock_kind(kind):
+    # Held until commit, so the running count below can't change under us.
+    if db.session.get_bind().dialect.name == "postgresql":
+        db.session.execute(
+            db.text("SELECT pg_advisory_xact_lock(:key)"), {"key": zlib.crc32(f"jobs:{kind}".encode())}
+        )
+
+
+def claim(worker):
+    """Mark the oldest runnable job as running and return it, or None.
+
+    Kinds with ``max_running`` are claimed under a per-kind advisory lock on
+    PostgreSQL. The running count is checked inside the claiming UPDATE, so
+    concurrent workers can't both take the last slot. SQLite serializes the
+    UPDATE instead.
+    """
+    now = _now()
+    saturated = []
+    while True:
+        # SKIP LOCKED lets PostgreSQL workers pass over rows being claimed by
+        # others; SQLite ignores it.
+        candidate = db.session.execute(
+            db.select(JobModel.id, JobModel.kind)
+            .where(JobModel.status == "queued", JobModel.run_after <= now, JobModel.kind.not_in(saturated))
+            .order_by(JobModel.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+        if candidate is None:
+            db.session.commit()
+            return None
+
+        stmt = db.update(JobModel).where(JobModel.id == candidate.id, JobModel.status == "queued")
+        max_running = handlers.get(candidate.kind, {}).get("max_running")
+        if max_running is not None:
+            _lock_kind(candidate.kind)
+            running = db.aliased(JobModel)
+            stmt = stmt.where(
+                db.select(db.func.count(running.id))
+                .where(running.kind == candidate.kind, running.status == "running")
+                .scalar_subquery() < max_running
+            )
+        job = db.session.execute(
+            stmt.values(status="running", attempts=JobModel.attempts + 1, worker=worker, started_at=now, updated_at=now)
+            .returning(JobModel.id, JobModel.kind, JobModel.payload, JobModel.attempts, JobModel.max_attempts)
+        ).first()
+        if job is not None:
+            db.session.commit()
+            return job
+        db.session.rollback()
+        # Otherwise another worker claimed this job first, so look again.
+        if max_running is not None:
+            saturated.append(candidate.kind)
+
+
+def requeue_stale():
+    """Requeue running jobs whose worker stopped reporting for longer than LEASE.
+
+    Jobs that have used all their attempts, e.g. because they keep getting
+    their worker killed, are failed instead.
+    """
+    now = _now()
+    stale = db.and_(JobModel.status == "running", JobModel.updated_at < now - LEASE)
+    db.session.execute(
+        db.update(JobModel)
+        .where(stale, JobModel.attempts >= JobModel.max_attempts)
+        .values(status="failed", error="The worker running this job stopped responding.", worker=None,
+                updated_at=now, finished_at=now)
+    )
+    db.session.execute(
+        db.update(JobModel)
+        .where(stale)
+        .values(status="queued", worker=None, updated_at=now)
+    )
+    db.session.commit()
+
+
+def run(job):
+    try:
+        handlers[job.kind]["func"](JobContext(job.id), json.loads(job.payload))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Job %d (%s) failed on attempt %d.", job.id, job.kind, job.attempts)
+        if job.attempts < job.max_attempts:
+            _update_job(
+                job.id,
+                status="queued",
+                error=str(e),
+                run_after=_now() + timedelta(seconds=2 ** job.attempts)
+            )
+        else:
+            _update_job(job.id, status="failed", error=str(e), finished_at=_now())
+    else:
+        _update_job(job.id, status="succeeded", error=None, finished_at=_now())
+
+
+class Worker:
+    def __init__(self, app, concurrency=1, poll_interval=1.0, once=False):
+        self.app = app
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.once = once
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+
+    def _loop(self, index):
+        worker = f"{self.name}:{index}"
+        while not self.stopping.is_set():
+            with self.app.app_context():
+                try:
+                    job = claim(worker)
+                    if job is not None:
+                        run(job)
+                        continue
+                    requeue_stale()
+                except Exception:
+                    logger.exception("Could not claim a job.")
+            if self.once:
+                return
+            self.stopping.wait(self.poll_interval)
+
+    def run(self):
+        threads = [
+            threading.Thread(target=self._loop, args=(index,), daemon=True)
+            for index in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.5)
+
+
+@click.command("worker")
+@click.option("--concurrency", default=1, show_default=True, help="Jobs run in parallel by this worker.")
+@click.option("--poll-interval", default=1.0, show_default=True, help="Seconds to wait when the queue is empty.")
+@click.option("--once", is_flag=True, help="Exit once the queue is empty.")
+@with_appcontext
+def worker_command(concurrency, poll_interval, once):
+    """Run queued background jobs."""
+    worker = Worker(current_app._get_current_object(), concurrency, poll_interval, once)
+
+    def stop(signum, frame):
+        click.echo("Finishing running jobs before exiting.")
+        worker.stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    worker.run()
+
+
+# Catalog jobs. Each commits per batch, so retries carry on where a failed
+# attempt stopped.
+
+def _in_batches(query):
+    while True:
+        batch = query.limit(BATCH_SIZE).all()
+        if not batch:
+            return
+        yield batch
+
+
+@job_handler("delete_store", DeleteStoreJobSchema, max_running=1)
+def delete_store(job, payload):
+    store_id = payload["store_id"]
+    total = (
+        TagModel.query.filter(TagModel.store_id == store_id).count()
+        + ItemModel.query.filter(ItemModel.store_id == store_id).count()
+    )
+    done = 0
+    for query in (
+        TagModel.query.filter(TagModel.store_id == store_id),
+        ItemModel.query.filter(ItemModel.store_id == store_id)
+    ):
+        for batch in _in_batches(query):
+            for row in batch:
+                db.session.delete(row)
+            db.session.commit()
+            done += len(batch)
+            job.progress(done, total)
+
+    store = db.session.get(StoreModel, store_id)
+    if store is not None:
+        db.session.delete(store)
+        db.session.commit()
+
+
+@job_handler("tag_items", TagItemsJobSchema)
+def tag_items(job, payload):
+    tag = db.session.get(TagModel, payload["tag_id"])
+    if tag is None:
+        raise ValueError(f"Tag {payload['tag_id']} does not exist.")
+
+    item_ids = payload["item_ids"]
+    for start in range(0, len(item_ids), BATCH_SIZE):
+        batch = item_ids[start:start + BATCH_SIZE]
+        linked = db.select(TagItemModel.items_id).where(TagItemModel.tag_id == tag.id)
+        items = ItemModel.query.filter(
+            ItemModel.id.in_(batch),
+            ItemModel.store_id == tag.store_id,
+            ItemModel.id.not_in(linked)
+        ).all()
+        for item in items:
+            item.tags.append(tag)
+        tag.item_count = TagModel.item_count + len(items)
+        if items:
+            record_change("tag", tag.id, "update", tag.store_id)
+        db.session.commit()
+        job.progress(start + len(batch), len(item_ids))
+
+
+@job_handler("import_items", ImportItemsJobSchema)
+def import_items(job, payload):
+    if db.session.get(StoreModel, payload["store_id"]) is None:
+        raise ValueError(f"Store {payload['store_id']} does not exist.")
+
+    items = payload["items"]
+    for start in range(0, len(items), BATCH_SIZE):
+        batch = items[start:start + BATCH_SIZE]
+        existing = set(db.session.scalars(
+            db.select(ItemModel.name).where(ItemModel.name.in_([item["name"] for item in batch]))
+        ))
+        db.session.add_all(
+            ItemModel(store_id=payload["store_id"], **item)
+            for item in batch if item["name"] not in existing
+        )
+        db.session.commit()
+        job.progress(start + len(batch), len(items))
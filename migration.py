@@ -0,0 +1,100 @@
+import zlib
+from contextlib import contextmanager
+
+import click
+import sqlalchemy as sa
+from alembic import op
+from alembic.script import ScriptDirectory
+from flask import current_app
+from flask.cli import with_appcontext
+from flask_migrate import upgrade
+from sqlalchemy.exc import SQLAlchemyError
+
+from db import db
+
+
+LOCK_KEY = zlib.crc32(b"flaskrestapi-migrations")
+
+
+def head_revisions():
+    config = current_app.extensions["migrate"].migrate.get_config()
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+def current_revisions():
+    """Read the applied revisions with a single query, empty if never migrated."""
+    with db.engine.connect() as connection:
+        try:
+            return set(connection.execute(sa.text("SELECT version_num FROM alembic_version")).scalars())
+        except SQLAlchemyError:
+            return set()
+
+
+@contextmanager
+def migration_lock():
+    """Serialize migrations across replicas sharing the database."""
+    if db.engine.dialect.name == "postgresql":
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(sa.text("SELECT pg_advisory_lock(:key)"), {"key": LOCK_KEY})
+            try:
+                yield
+            finally:
+                connection.execute(sa.text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+    elif db.engine.dialect.name == "sqlite" and db.engine.url.database not in (None, "", ":memory:"):
+        import fcntl
+
+        with open(f"{db.engine.url.database}.migrate.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    else:
+        yield
+
+
+@click.command("upgrade-db")
+@with_appcontext
+def upgrade_db_command():
+    """Upgrade the database unless it is already at the latest revision."""
+    heads = head_revisions()
+    if current_revisions() == heads:
+        click.echo("Database is up to date.")
+        return
+
+    with migration_lock():
+        # Another replica may have finished while we waited for the lock.
+        if current_revisions() == heads:
+            click.echo("Database is up to date.")
+            return
+        upgrade()
+
+
+# Helpers for revisions in migrations/versions that touch large tables.
+
+def create_index_concurrently(index_name, table_name, columns, **kwargs):
+    """Create an index without locking writes out of the table on PostgreSQL.
+
+    Elsewhere this is a plain CREATE INDEX.
+    """
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.create_index(index_name, table_name, columns, postgresql_concurrently=True, **kwargs)
+    else:
+        op.create_index(index_name, table_name, columns, **kwargs)
+
+
+def batched_backfill(table_name, assignments, where, batch_size=1000, primary_key="id"):
+    """Run ``UPDATE table_name SET assignments`` on rows matching ``where``.
+
+    Each batch of ``batch_size`` rows is committed on its own so row locks
+    are held briefly. ``where`` must stop matching a row once it has been
+    updated, e.g. ``"item_count IS NULL"``.
+    """
+    statement = sa.text(
+        f"UPDATE {table_name} SET {assignments} WHERE {primary_key} IN "
+        f"(SELECT {primary_key} FROM {table_name} WHERE {where} LIMIT {int(batch_size)})"
+    )
+    with op.get_context().autocommit_block():
+        while op.get_bind().execute(statement).rowcount:
+            pass
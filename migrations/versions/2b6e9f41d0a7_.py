@@ -0,0 +1,26 @@
+"""add user token generation
+
+Revision ID: 2b6e9f41d0a7
+Revises: 8f3a1d2b7c4e
+Create Date: 2026-10-19 10:03:47.215930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b6e9f41d0a7'
+down_revision = '8f3a1d2b7c4e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_generation', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('token_generation')
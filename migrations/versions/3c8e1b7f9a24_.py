@@ -0,0 +1,35 @@
+"""unique tag links
+
+Revision ID: 3c8e1b7f9a24
+Revises: e93b4f6a2c18
+Create Date: 2026-10-20 09:18:42.361508
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c8e1b7f9a24'
+down_revision = 'e93b4f6a2c18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Links used to be insertable twice; keep the oldest and recount.
+    op.execute(
+        "DELETE FROM tags_items WHERE id NOT IN "
+        "(SELECT min(id) FROM tags_items GROUP BY tag_id, items_id)"
+    )
+    op.execute(
+        "UPDATE tags SET item_count = "
+        "(SELECT count(*) FROM tags_items WHERE tags_items.tag_id = tags.id)"
+    )
+    with op.batch_alter_table('tags_items', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_tags_items_tag_id_items_id', ['tag_id', 'items_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('tags_items', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_tags_items_tag_id_items_id', type_='unique')
@@ -0,0 +1,31 @@
+"""add tag item count
+
+Revision ID: 6a0f5e83b1d9
+Revises: d41c7a9e3f52
+Create Date: 2026-10-19 13:40:18.096524
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a0f5e83b1d9'
+down_revision = 'd41c7a9e3f52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tags', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('item_count', sa.Integer(), server_default='0', nullable=False))
+
+    op.execute(
+        "UPDATE tags SET item_count = "
+        "(SELECT count(*) FROM tags_items WHERE tags_items.tag_id = tags.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('tags', schema=None) as batch_op:
+        batch_op.drop_column('item_count')
@@ -0,0 +1,26 @@
+"""add item version
+
+Revision ID: 8f3a1d2b7c4e
+Revises: 5c9c5cb1ca04
+Create Date: 2026-10-19 09:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f3a1d2b7c4e'
+down_revision = '5c9c5cb1ca04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('items', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,29 @@
+"""add store documents
+
+Revision ID: b7d28c05e6f1
+Revises: 6a0f5e83b1d9
+Create Date: 2026-10-19 15:02:56.734410
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d28c05e6f1'
+down_revision = '6a0f5e83b1d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('store_documents',
+    sa.Column('store_id', sa.Integer(), nullable=False),
+    sa.Column('document', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['store_id'], ['stores.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('store_id')
+    )
+
+
+def downgrade():
+    op.drop_table('store_documents')
@@ -4,3 +4,6 @@ from models.tag import TagModel
 from models.tag_item import TagItemModel
 from models.user import UserModel
 from models.token import RevokedTokenModel
+from models.change import ChangeModel
+from models.store_document import StoreDocumentModel
+from models.job import JobModel
@@ -0,0 +1,13 @@
+from db import db
+
+
+class ChangeModel(db.Model):
+    __tablename__ = "changes"
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    related_id = db.Column(db.Integer)
+    store_id = db.Column(db.Integer, index=True)
+    action = db.Column(db.String(10), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
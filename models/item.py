@@ -9,6 +9,7 @@ class ItemModel(db.Model):
     description = db.Column(db.String)
     price = db.Column(db.Integer, unique=False, nullable=False)
     store_id = db.Column(db.Integer, db.ForeignKey("stores.id"), unique=False, nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
 
     store = db.relationship("StoreModel", back_populates="items")
     tags = db.relationship("TagModel", back_populates="items", secondary="tags_items")
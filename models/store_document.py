@@ -0,0 +1,8 @@
+from db import db
+
+
+class StoreDocumentModel(db.Model):
+    __tablename__ = "store_documents"
+
+    store_id = db.Column(db.Integer, db.ForeignKey("stores.id", ondelete="CASCADE"), primary_key=True)
+    document = db.Column(db.Text, nullable=False)
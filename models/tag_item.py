@@ -3,6 +3,7 @@ from db import db
 
 class TagItemModel(db.Model):
     __tablename__ = "tags_items"
+    __table_args__ = (db.UniqueConstraint("tag_id", "items_id"),)
 
     id = db.Column(db.Integer, primary_key=True)
     tag_id = db.Column(db.Integer, db.ForeignKey("tags.id"))
@@ -7,3 +7,4 @@ class UserModel(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(256), nullable=False)
+    token_generation = db.Column(db.Integer, nullable=False, default=0, server_default="0")
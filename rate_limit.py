@@ -0,0 +1,129 @@
+import math
+import threading
+import time
+
+from flask import request
+from flask_jwt_extended import decode_token
+from flask_smorest import abort
+
+
+DEFAULT_COSTS = {
+    ("POST", "users.UserLogin"): 10,
+    ("POST", "users.UserRegister"): 10,
+    ("GET", "items.ItemList"): 5,
+    ("GET", "stores.StoreList"): 5,
+    ("POST", "jobs.JobList"): 5,
+    ("GET", "changes.Changes"): 5,
+}
+
+
+class MemoryBackend:
+    """Token buckets held in this worker.
+
+    A shared backend (e.g. one backed by Redis) only has to provide the same
+    ``take`` method to make limits apply across workers and hosts.
+    """
+
+    max_buckets = 100_000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def take(self, key, cost, rate, capacity):
+        """Take ``cost`` tokens from ``key``'s bucket.
+
+        Return 0 if they were available, otherwise the seconds until they will be.
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_buckets:
+                    self._prune(now, rate, capacity)
+                bucket = self._buckets[key] = [capacity, now]
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens >= cost:
+                bucket[0] = tokens - cost
+                return 0
+            bucket[0] = tokens
+            return (cost - tokens) / rate
+
+    def _prune(self, now, rate, capacity):
+        # Buckets that have refilled completely are the same as new ones.
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items()
+            if bucket[0] + (now - bucket[1]) * rate < capacity
+        }
+
+
+class RateLimiter:
+    """Admission control with a token bucket per JWT identity, or per IP without one.
+
+    Each request costs ``RATE_LIMIT_COSTS[(method, endpoint)]`` tokens (1 by
+    default) and buckets refill at ``RATE_LIMIT_RATE`` tokens per second up to
+    ``RATE_LIMIT_BURST``. With the default MemoryBackend limits apply per worker.
+    """
+
+    max_cached_tokens = 10_000
+
+    def __init__(self, app=None):
+        self._identities = {}
+        self._rejected = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RATE_LIMIT_ENABLED", True)
+        app.config.setdefault("RATE_LIMIT_RATE", 10.0)
+        app.config.setdefault("RATE_LIMIT_BURST", 50)
+        app.config.setdefault("RATE_LIMIT_COSTS", DEFAULT_COSTS)
+        app.config.setdefault("RATE_LIMIT_BACKEND", MemoryBackend())
+        self.app = app
+        app.extensions["rate_limit"] = self
+        app.before_request(self.check)
+
+    def _key(self, req):
+        authorization = req.environ.get("HTTP_AUTHORIZATION")
+        if authorization:
+            identity = self._identities.get(authorization)
+            if identity is None and authorization not in self._rejected:
+                identity = self._decode(authorization)
+            if identity is not None:
+                return identity
+        return f"ip:{req.remote_addr}"
+
+    def _decode(self, authorization):
+        # Verifying the signature is the costly part, so do it once per token.
+        # Rejected tokens are remembered apart, so junk headers can't push
+        # valid identities out of the cache.
+        try:
+            claims = decode_token(authorization.removeprefix("Bearer "), allow_expired=True)
+        except Exception:
+            if len(self._rejected) >= self.max_cached_tokens:
+                self._rejected.clear()
+            self._rejected.add(authorization)
+            return None
+        identity = f"user:{claims['sub']}"
+        if len(self._identities) >= self.max_cached_tokens:
+            self._identities.clear()
+        self._identities[authorization] = identity
+        return identity
+
+    def check(self):
+        config = self.app.config
+        if not config["RATE_LIMIT_ENABLED"]:
+            return
+        # Resolve the request proxy once, it dominates the cost of this check.
+        req = request._get_current_object()
+        cost = config["RATE_LIMIT_COSTS"].get((req.method, req.endpoint), 1)
+        retry_after = config["RATE_LIMIT_BACKEND"].take(
+            self._key(req), cost, config["RATE_LIMIT_RATE"], config["RATE_LIMIT_BURST"]
+        )
+        if retry_after:
+            abort(
+                429,
+                message="Too many requests, slow down.",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
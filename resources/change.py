@@ -0,0 +1,94 @@
+import json
+import threading
+import time
+
+from flask import request, Response, stream_with_context
+from flask.views import MethodView
+
+from flask_jwt_extended import jwt_required
+
+from flask_smorest import Blueprint, abort
+
+from changes import feed
+from schemas import ChangeSchema, ChangeQuerySchema, ChangeFeedSchema
+
+
+KEEPALIVE_INTERVAL = 10
+# Streams end before gunicorn's 30 s worker timeout. Clients reconnect after
+# the `retry:` delay and resume from Last-Event-ID.
+STREAM_DURATION = 25
+# Each waiting request holds one of the worker's 8 threads (see
+# docker-entrypoint.sh), so leave some for everything else.
+MAX_WAITERS = 6
+
+_waiters = threading.BoundedSemaphore(MAX_WAITERS)
+
+
+blueprint = Blueprint("changes",
+                      __name__,
+                      description="""Change feed for stores, items, tags and tag links.
+                      Every change has an increasing ID which is used as the resume cursor.
+                      """)
+
+
+def _event_stream(cursor, store_id):
+    schema = ChangeSchema()
+    # An event with only an id sets Last-Event-ID without dispatching, so a
+    # stream that ends quietly still resumes from where it started.
+    yield f"retry: 3000\nid: {cursor}\n\n"
+    deadline = time.monotonic() + STREAM_DURATION
+    while (remaining := deadline - time.monotonic()) > 0:
+        changes = feed.wait(cursor, min(KEEPALIVE_INTERVAL, remaining), store_id)
+        if not changes:
+            yield ": keepalive\n\n"
+            continue
+        for change in changes:
+            yield f"id: {change['id']}\nevent: change\ndata: {json.dumps(schema.dump(change))}\n\n"
+        cursor = changes[-1]["id"]
+
+
+@blueprint.route("/changes")
+class Changes(MethodView):
+    @jwt_required()
+    @blueprint.arguments(ChangeQuerySchema, location="query")
+    @blueprint.response(200, ChangeFeedSchema)
+    @blueprint.alt_response(
+        503,
+        description="""Returned if this worker is already serving too many
+        long-polls and streams. Retry after the Retry-After delay"""
+    )
+    def get(self, args):
+        """Following changes
+
+        Return changes after the `since` cursor, waiting up to `timeout` seconds
+        (at most 25) for one to happen. Without a cursor only changes from now on
+        are returned. Clients sending `Accept: text/event-stream` get a Server-Sent
+        Events stream instead. It closes after 25 seconds, and clients reconnect
+        and resume from the `Last-Event-ID` header.
+        """
+        store_id = args.get("store_id")
+        since = args.get("since")
+        if since is None and request.headers.get("Last-Event-ID", "").isdigit():
+            since = int(request.headers["Last-Event-ID"])
+        if since is None:
+            since = feed.head()
+
+        if not _waiters.acquire(blocking=False):
+            abort(503, message="Too many clients are following changes.", headers={"Retry-After": "3"})
+
+        if request.accept_mimetypes.best == "text/event-stream":
+            response = Response(
+                stream_with_context(_event_stream(since, store_id)),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+            # The stream keeps its slot until the server closes the response.
+            response.call_on_close(_waiters.release)
+            return response
+
+        try:
+            changes = feed.wait(since, args["timeout"], store_id)
+        finally:
+            _waiters.release()
+        cursor = changes[-1]["id"] if changes else since
+        return {"cursor": cursor, "changes": changes}
@@ -4,17 +4,29 @@ from flask.views import MethodView
 from flask_jwt_extended import jwt_required, get_jwt
 
 from flask_smorest import Blueprint, abort
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
-from models import ItemModel
-from schemas import ItemSchema, ItemUpdateSchema
+from models import ItemModel, StoreModel, TagModel, TagItemModel
+from schemas import ItemSchema, ItemUpdateSchema, ItemFilterQuerySchema
 
-from db import db
+from db import db, upsert_insert
+from changes import record_change
 
 
 blueprint = Blueprint("items", __name__, description="Operations on items")
 
 
+def _etag(item):
+    return {"ETag": f'"{item.version}"'}
+
+
+def _column_or_current(item_data, key, item_id):
+    """Use the supplied value, falling back to the stored one inside the same statement."""
+    if key in item_data:
+        return item_data[key]
+    return db.select(getattr(ItemModel, key)).where(ItemModel.id == item_id).scalar_subquery()
+
+
 @blueprint.route("/item/<int:item_id>")
 class Item(MethodView):
     @jwt_required()
@@ -25,7 +37,7 @@ class Item(MethodView):
         Return an item based on ID.
         """
         item = ItemModel.query.get_or_404(item_id)
-        return item
+        return item, 200, _etag(item)
 
     @jwt_required(fresh=True)
     def delete(self, item_id):
@@ -34,6 +46,14 @@ class Item(MethodView):
         Remove an item based on ID.
         """
         item = ItemModel.query.get_or_404(item_id)
+        tags = db.session.execute(
+            db.update(TagModel)
+            .where(TagModel.id.in_(db.select(TagItemModel.tag_id).where(TagItemModel.items_id == item_id)))
+            .values(item_count=TagModel.item_count - 1)
+            .returning(TagModel.id, TagModel.store_id)
+        ).all()
+        for tag in tags:
+            record_change("tag", tag.id, "update", tag.store_id)
         db.session.delete(item)
         db.session.commit()
         return {"message": "Item deleted successfully."}
@@ -41,22 +61,56 @@ class Item(MethodView):
     @jwt_required(fresh=True)
     @blueprint.arguments(ItemUpdateSchema)
     @blueprint.response(200, ItemSchema)
+    @blueprint.alt_response(
+        412,
+        description="""Returned if an If-Match header was sent and the
+        item does not exist or its version has changed"""
+    )
     def put(self, item_data, item_id):
         """Updating an item
 
-        Update an item based on ID.
+        Update an item based on ID, or create it if it does not exist.
+        Send the item's ETag in If-Match to only update that version.
         """
-        item = ItemModel.query.get(item_id)
-
-        if item:
-            item.price = item_data["price"]
-            item.name = item_data["name"]
+        fields = {key: item_data[key] for key in ("name", "price") if key in item_data}
+
+        if "If-Match" in request.headers:
+            stmt = db.update(ItemModel).where(ItemModel.id == item_id)
+            if not request.if_match.star_tag:
+                versions = [int(tag) for tag in request.if_match.as_set() if tag.isdigit()]
+                stmt = stmt.where(ItemModel.version.in_(versions))
+            stmt = stmt.values(**fields, version=ItemModel.version + 1)
         else:
-            item = ItemModel(id=item_id, **item_data)
+            stmt = upsert_insert(ItemModel).values(
+                id=item_id,
+                **{key: _column_or_current(item_data, key, item_id) for key in ("name", "price", "store_id")}
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ItemModel.id],
+                set_={
+                    **{key: stmt.excluded[key] for key in fields},
+                    "version": ItemModel.version + 1
+                }
+            )
 
-        db.session.add(item)
-        db.session.commit()
-        return item
+        try:
+            item = db.session.scalars(
+                stmt.returning(ItemModel),
+                execution_options={"populate_existing": True}
+            ).first()
+            if item is not None:
+                record_change("item", item.id, "create" if item.version == 1 else "update", item.store_id)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            abort(400, message="Item name must be unique, and name, price and store_id are required to create an item.")
+        except SQLAlchemyError:
+            db.session.rollback()
+            abort(500, message="An error occured while updating the item.")
+
+        if item is None:
+            abort(412, message="The item has been modified or does not exist.")
+        return item, 200, _etag(item)
 
 
 @blueprint.route("/item")
@@ -85,3 +139,32 @@ class ItemList(MethodView):
         except SQLAlchemyError:
             abort(500, message="An error occured while inserting the item.")
         return item
+
+
+@blueprint.route("/store/<int:store_id>/item")
+class ItemsInStore(MethodView):
+    @jwt_required()
+    @blueprint.arguments(ItemFilterQuerySchema, location="query")
+    @blueprint.response(200, ItemSchema(many=True))
+    def get(self, args, store_id):
+        """Getting items of a store
+
+        Return all items from a store based on ID, optionally only those
+        having all (`match=all`) or any (`match=any`) of the given tag names.
+        """
+        StoreModel.query.get_or_404(store_id)
+        query = ItemModel.query.filter(ItemModel.store_id == store_id)
+
+        tag_names = set(args.get("tags", []))
+        if tag_names:
+            matching = (
+                db.select(TagItemModel.items_id)
+                .join(TagModel, TagModel.id == TagItemModel.tag_id)
+                .where(TagModel.store_id == store_id, TagModel.name.in_(tag_names))
+                .group_by(TagItemModel.items_id)
+            )
+            if args["match"] == "all":
+                matching = matching.having(db.func.count(db.distinct(TagModel.name)) == len(tag_names))
+            query = query.filter(ItemModel.id.in_(matching))
+
+        return query.options(db.selectinload(ItemModel.tags)).all()
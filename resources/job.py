@@ -0,0 +1,50 @@
+from flask.views import MethodView
+
+from flask_jwt_extended import jwt_required
+
+from flask_smorest import Blueprint, abort
+from marshmallow import ValidationError
+
+from jobs import enqueue, handlers
+from models import JobModel
+from schemas import JobSchema, JobCreateSchema
+
+
+blueprint = Blueprint("jobs",
+                      __name__,
+                      description="""Operations on background jobs.
+                      Jobs are run by `flask worker` processes, outside of requests.
+                      """)
+
+
+@blueprint.route("/job/<int:job_id>")
+class Job(MethodView):
+    @jwt_required()
+    @blueprint.response(200, JobSchema)
+    def get(self, job_id):
+        """Finding a job
+
+        Return the status and progress of a job based on ID.
+        """
+        job = JobModel.query.get_or_404(job_id)
+        return job
+
+
+@blueprint.route("/job")
+class JobList(MethodView):
+    @jwt_required(fresh=True)
+    @blueprint.arguments(JobCreateSchema)
+    @blueprint.response(202, JobSchema)
+    def post(self, job_data):
+        """Enqueuing a job
+
+        Enqueue a `delete_store`, `tag_items` or `import_items` job with its payload.
+        """
+        handler = handlers.get(job_data["kind"])
+        if handler is None:
+            abort(422, message=f"Unknown job kind. Use one of: {', '.join(sorted(handlers))}.")
+        try:
+            payload = handler["schema"]().load(job_data["payload"])
+        except ValidationError as e:
+            abort(422, errors={"json": {"payload": e.messages}})
+        return enqueue(job_data["kind"], payload, job_data["max_attempts"])
@@ -1,4 +1,4 @@
-from flask import request
+from flask import request, Response
 from flask.views import MethodView
 
 from flask_jwt_extended import jwt_required
@@ -6,8 +6,9 @@ from flask_jwt_extended import jwt_required
 from flask_smorest import Blueprint, abort
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
-from schemas import StoreSchema
-from models import StoreModel
+from schemas import StoreSchema, StoreSummarySchema
+from models import StoreModel, ItemModel, TagModel
+from store_documents import get_document
 
 from db import db
 
@@ -24,8 +25,10 @@ class Store(MethodView):
 
         Return a store based on ID.
         """
-        store = StoreModel.query.get_or_404(store_id)
-        return store
+        document = get_document(store_id)
+        if document is None:
+            abort(404)
+        return Response(document, mimetype="application/json")
 
     @jwt_required(fresh=True)
     def delete(self, store_id):
@@ -39,6 +42,35 @@ class Store(MethodView):
         return {"message": "Store deleted successfully."}
 
 
+@blueprint.route("/store/<int:store_id>/summary")
+class StoreSummary(MethodView):
+    @jwt_required()
+    @blueprint.response(200, StoreSummarySchema)
+    def get(self, store_id):
+        """Summarizing a store
+
+        Return item and tag counts and price statistics of a store based on ID.
+        """
+        tag_count = db.select(db.func.count(TagModel.id)).where(TagModel.store_id == store_id).scalar_subquery()
+        summary = db.session.execute(
+            db.select(
+                StoreModel.id,
+                StoreModel.name,
+                db.func.count(ItemModel.id).label("item_count"),
+                tag_count.label("tag_count"),
+                db.func.min(ItemModel.price).label("min_price"),
+                db.func.max(ItemModel.price).label("max_price"),
+                db.func.avg(ItemModel.price).label("avg_price")
+            )
+            .outerjoin(ItemModel, ItemModel.store_id == StoreModel.id)
+            .where(StoreModel.id == store_id)
+            .group_by(StoreModel.id, StoreModel.name)
+        ).mappings().first()
+        if summary is None:
+            abort(404)
+        return summary
+
+
 @blueprint.route("/store")
 class StoreList(MethodView):
     @jwt_required()
@@ -7,9 +7,10 @@ from flask_smorest import Blueprint, abort
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
 from models import TagModel, StoreModel, ItemModel
-from schemas import TagSchema, TagAndItemSchema
+from schemas import TagSchema, PlainTagSchema, TagAndItemSchema
 
 from db import db
+from changes import record_change
 
 
 blueprint = Blueprint("tags",
@@ -79,10 +80,20 @@ class LinkTagsToItem(MethodView):
             abort(400, message="""Ensure item and tag belong to the same
             store before linking.""")
 
+        if tag in item.tags:
+            return tag
+
         item.tags.append(tag)
+        tag.item_count = TagModel.item_count + 1
         try:
             db.session.add(item)
+            # The count is updated with a SQL expression, so the flush doesn't
+            # see a tag change of its own.
+            record_change("tag", tag.id, "update", tag.store_id)
             db.session.commit()
+        except IntegrityError:
+            # A concurrent request linked them first; its count stands.
+            db.session.rollback()
         except SQLAlchemyError:
             abort(500, message="An error occurred while inserting the tag.")
         return tag
@@ -95,17 +106,37 @@ class LinkTagsToItem(MethodView):
         Remove a link between item and tag based on ID.
         """
         item = ItemModel.query.get_or_404(item_id)
-        tag = ItemModel.query.get_or_404(tag_id)
+        tag = TagModel.query.get_or_404(tag_id)
+
+        if tag not in item.tags:
+            abort(404, message="Item is not linked to that tag.")
 
         item.tags.remove(tag)
+        tag.item_count = TagModel.item_count - 1
         try:
             db.session.add(item)
+            record_change("tag", tag.id, "update", tag.store_id)
             db.session.commit()
         except SQLAlchemyError:
             abort(500, message="An error occurred while inserting the tag.")
         return {"message": "Item removed from tag", "item": item, "tag": tag}
 
 
+@blueprint.route("/store/<int:store_id>/tag/usage")
+class TagUsageInStore(MethodView):
+    @jwt_required()
+    @blueprint.response(200, PlainTagSchema(many=True))
+    def get(self, store_id):
+        """Getting tag usage of a store
+
+        Return the tags of a store with their item counts, most used first.
+        """
+        StoreModel.query.get_or_404(store_id)
+        return TagModel.query.filter(TagModel.store_id == store_id).order_by(
+            TagModel.item_count.desc(), TagModel.name
+        ).all()
+
+
 @blueprint.route("/store/<int:store_id>/tag")
 class TagsInStore(MethodView):
     @jwt_required()
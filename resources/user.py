@@ -1,4 +1,4 @@
-from flask import request
+from flask import request, current_app
 from flask.views import MethodView
 from passlib.hash import pbkdf2_sha256
 
@@ -13,7 +13,7 @@ from flask_jwt_extended import(
 )
 
 from schemas import UserSchema
-from models import UserModel, RevokedTokenModel
+from models import UserModel
 
 from db import db
 
@@ -54,8 +54,9 @@ class UserLogin(MethodView):
         ).first()
 
         if user and pbkdf2_sha256.verify(user_data["password"], user.password):
-            accessToken = create_access_token(identity=user.id, fresh=True)
-            refreshToken = create_refresh_token(identity=user.id)
+            claims = {"gen": user.token_generation}
+            accessToken = create_access_token(identity=user.id, fresh=True, additional_claims=claims)
+            refreshToken = create_refresh_token(identity=user.id, additional_claims=claims)
             return {"access_token": accessToken, "refresh_token": refreshToken}
         abort(401, message="Invalid credentials.")
 
@@ -68,13 +69,28 @@ class UserLogout(MethodView):
 
         Revoke a user token.
         """
-        jti = str(get_jwt()["jti"])
-        revoked = RevokedTokenModel(jti=jti)
-        db.session.add(revoked)
-        db.session.commit()
+        jwt = get_jwt()
+        current_app.extensions["revocation"].revoke(str(jwt["jti"]), jwt.get("exp"))
         return {"message": "Token revoked successfully."}
 
 
+@blueprint.route("/logout/all")
+class UserLogoutAll(MethodView):
+    @jwt_required()
+    def post(self):
+        """Revoking all user tokens
+
+        Revoke every token issued to the user so far.
+        """
+        db.session.execute(
+            db.update(UserModel)
+            .where(UserModel.id == get_jwt_identity())
+            .values(token_generation=UserModel.token_generation + 1)
+        )
+        db.session.commit()
+        return {"message": "All tokens revoked successfully."}
+
+
 @blueprint.route("/refresh")
 class TokenRefresh(MethodView):
     @jwt_required(refresh=True)
@@ -84,7 +100,8 @@ class TokenRefresh(MethodView):
         Get a new user token by providing a refresh token.
         """
         current_user = get_jwt_identity()
-        new_token = create_access_token(identity=current_user, fresh=False)
+        claims = {"gen": get_jwt().get("gen", 0)}
+        new_token = create_access_token(identity=current_user, fresh=False, additional_claims=claims)
         return {"access_token": new_token}
 
 
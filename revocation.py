@@ -0,0 +1,88 @@
+import atexit
+import logging
+import threading
+import time
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from db import db, upsert_insert
+from models import RevokedTokenModel
+
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationBuffer:
+    """Write-behind buffer for revoked token JTIs.
+
+    Revoked JTIs are rejected by this worker straight away and written to
+    the database in multi-row inserts once ``REVOCATION_BATCH_SIZE`` tokens
+    are pending or ``REVOCATION_FLUSH_INTERVAL`` seconds have passed. Other
+    workers see a revocation once its batch has been flushed.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._pending = []
+        self._revoked = {}
+        self._timer = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("REVOCATION_BATCH_SIZE", 100)
+        app.config.setdefault("REVOCATION_FLUSH_INTERVAL", 1.0)
+        self.app = app
+        self.batch_size = app.config["REVOCATION_BATCH_SIZE"]
+        self.flush_interval = app.config["REVOCATION_FLUSH_INTERVAL"]
+        app.extensions["revocation"] = self
+        atexit.register(self.flush)
+
+    def is_revoked(self, jti):
+        return jti in self._revoked
+
+    def revoke(self, jti, expires_at=None):
+        with self._lock:
+            self._revoked[jti] = expires_at
+            self._pending.append(jti)
+            full = len(self._pending) >= self.batch_size
+            if not full:
+                self._schedule()
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._prune()
+        if not batch:
+            return
+
+        with self.app.app_context():
+            stmt = upsert_insert(RevokedTokenModel).values([{"jti": jti} for jti in batch])
+            stmt = stmt.on_conflict_do_nothing(index_elements=[RevokedTokenModel.jti])
+            try:
+                db.session.execute(stmt)
+                db.session.commit()
+            except SQLAlchemyError:
+                db.session.rollback()
+                logger.exception("Could not flush %d revoked tokens, retrying later.", len(batch))
+                with self._lock:
+                    self._pending[:0] = batch
+                    self._schedule()
+
+    def _schedule(self):
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _prune(self):
+        # Expired tokens are rejected by the JWT checks anyway.
+        now = time.time()
+        for jti, expires_at in list(self._revoked.items()):
+            if expires_at is not None and expires_at < now:
+                del self._revoked[jti]
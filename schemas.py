@@ -1,4 +1,5 @@
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
+from webargs.fields import DelimitedList
 
 # Plain schema, used for nesting
 class PlainItemSchema(Schema):
@@ -10,6 +11,7 @@ class PlainItemSchema(Schema):
 class PlainTagSchema(Schema):
     id = fields.Int(dump_only=True)
     name = fields.Str(require=True)
+    item_count = fields.Int(dump_only=True)
 
 
 class PlainStoreSchema(Schema):
@@ -28,10 +30,16 @@ class ItemUpdateSchema(Schema):
 
 class ItemSchema(PlainItemSchema):
     store_id = fields.Int(required=True, load_only=True)
+    version = fields.Int(dump_only=True)
     store = fields.Nested(PlainStoreSchema, dump_only=True)
     tags = fields.List(fields.Nested(PlainTagSchema), dump_only=True)
 
 
+class ItemFilterQuerySchema(Schema):
+    tags = DelimitedList(fields.Str())
+    match = fields.Str(load_default="all", validate=validate.OneOf(["all", "any"]))
+
+
 class TagSchema(PlainTagSchema):
     store_id = fields.Int(require=True)
     store = fields.Nested(PlainStoreSchema, dump_only=True)
@@ -43,6 +51,14 @@ class StoreSchema(PlainStoreSchema):
     tags = fields.List(fields.Nested(PlainTagSchema), dump_only=True)
 
 
+class StoreSummarySchema(PlainStoreSchema):
+    item_count = fields.Int()
+    tag_count = fields.Int()
+    min_price = fields.Float()
+    max_price = fields.Float()
+    avg_price = fields.Float()
+
+
 class TagAndItemSchema(Schema):
     message = fields.Str()
     item = fields.Nested(ItemSchema)
@@ -53,3 +69,58 @@ class UserSchema(Schema):
     id = fields.Int(dump_only=True)
     username = fields.Str(required=True)
     password = fields.Str(required=True, load_only=True)
+
+
+class ChangeSchema(Schema):
+    id = fields.Int(dump_only=True)
+    entity = fields.Str(dump_only=True)
+    entity_id = fields.Int(dump_only=True)
+    related_id = fields.Int(dump_only=True)
+    store_id = fields.Int(dump_only=True)
+    action = fields.Str(dump_only=True)
+    created_at = fields.DateTime(dump_only=True)
+
+
+class ChangeQuerySchema(Schema):
+    since = fields.Int()
+    store_id = fields.Int()
+    timeout = fields.Int(load_default=20, validate=validate.Range(min=0, max=25))
+
+
+class ChangeFeedSchema(Schema):
+    cursor = fields.Int()
+    changes = fields.List(fields.Nested(ChangeSchema))
+
+
+class DeleteStoreJobSchema(Schema):
+    store_id = fields.Int(required=True)
+
+
+class TagItemsJobSchema(Schema):
+    tag_id = fields.Int(required=True)
+    item_ids = fields.List(fields.Int(), required=True)
+
+
+class ImportItemsJobSchema(Schema):
+    store_id = fields.Int(required=True)
+    items = fields.List(fields.Nested(PlainItemSchema), required=True)
+
+
+class JobCreateSchema(Schema):
+    kind = fields.Str(required=True)
+    payload = fields.Dict(required=True)
+    max_attempts = fields.Int(load_default=3, validate=validate.Range(min=1, max=10))
+
+
+class JobSchema(Schema):
+    id = fields.Int(dump_only=True)
+    kind = fields.Str(dump_only=True)
+    status = fields.Str(dump_only=True)
+    progress_done = fields.Int(dump_only=True)
+    progress_total = fields.Int(dump_only=True)
+    attempts = fields.Int(dump_only=True)
+    max_attempts = fields.Int(dump_only=True)
+    error = fields.Str(dump_only=True)
+    created_at = fields.DateTime(dump_only=True)
+    started_at = fields.DateTime(dump_only=True)
+    finished_at = fields.DateTime(dump_only=True)
@@ -0,0 +1,51 @@
+import logging
+import threading
+import time
+
+from sqlalchemy import event, text
+
+
+logger = logging.getLogger(__name__)
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "foreign_keys": "ON",
+    "temp_store": "MEMORY",
+}
+
+
+def configure_sqlite(engine, maintenance_interval=300):
+    """Apply PRAGMAS to every new connection and start periodic maintenance.
+
+    WAL lets readers run alongside the single writer, and busy_timeout
+    makes writers wait for the lock instead of failing straight away.
+    """
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    if maintenance_interval:
+        thread = threading.Thread(
+            target=_maintain, args=(engine, maintenance_interval), name="sqlite-maintenance", daemon=True
+        )
+        thread.start()
+
+
+def _maintain(engine, interval):
+    # Keep the WAL file from growing under constant reads and refresh planner
+    # statistics. PASSIVE never blocks readers or writers.
+    while True:
+        time.sleep(interval)
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("PRAGMA wal_checkpoint(PASSIVE)"))
+                connection.execute(text("PRAGMA optimize"))
+        except Exception:
+            logger.exception("SQLite maintenance failed.")
@@ -0,0 +1,172 @@
+import json
+
+import click
+from flask.cli import with_appcontext
+
+from db import db, upsert_insert
+from models import ItemModel, StoreModel, StoreDocumentModel, TagModel
+from schemas import PlainItemSchema, PlainTagSchema, StoreSchema
+
+
+_ITEM_COLUMNS = (ItemModel.id, ItemModel.name, ItemModel.price)
+_TAG_COLUMNS = (TagModel.id, TagModel.name, TagModel.item_count)
+
+
+def _encode(document):
+    return json.dumps(document, sort_keys=True)
+
+
+def build_document(connection, store_id):
+    """Serialize a store the way StoreSchema does, with one query per table."""
+    store = connection.execute(
+        db.select(StoreModel.id, StoreModel.name).where(StoreModel.id == store_id)
+    ).mappings().first()
+    if store is None:
+        return None
+    items = connection.execute(
+        db.select(*_ITEM_COLUMNS).where(ItemModel.store_id == store_id).order_by(ItemModel.id)
+    ).mappings().all()
+    tags = connection.execute(
+        db.select(*_TAG_COLUMNS).where(TagModel.store_id == store_id).order_by(TagModel.id)
+    ).mappings().all()
+    return StoreSchema().dump({**store, "items": items, "tags": tags})
+
+
+def _save(connection, store_id, document):
+    stmt = upsert_insert(StoreDocumentModel.__table__, connection).values(store_id=store_id, document=_encode(document))
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=[StoreDocumentModel.store_id],
+        set_={"document": stmt.excluded.document}
+    ))
+
+
+def _lock_store(connection, store_id):
+    """Serialize building and patching a store's document.
+
+    Without this, a document built from the tables while a write commits
+    misses that write. The write skips its patch because no document exists
+    yet, and the stale build is saved afterwards. PostgreSQL locks the store
+    row FOR NO KEY UPDATE. That lock doesn't conflict with the key-share
+    locks that item and tag inserts take on the row, so concurrent writers
+    can't deadlock on it. SQLite has one database-wide write lock, and a
+    no-op update takes it before anything is read.
+    """
+    if connection.dialect.name == "sqlite":
+        connection.execute(
+            db.update(StoreModel).where(StoreModel.id == store_id).values(name=StoreModel.name)
+        )
+    else:
+        connection.execute(
+            db.select(StoreModel.id).where(StoreModel.id == store_id).with_for_update(key_share=True)
+        )
+
+
+def _read(connection, store_id):
+    return connection.execute(
+        db.select(StoreDocumentModel.document).where(StoreDocumentModel.store_id == store_id)
+    ).scalar()
+
+
+def get_document(store_id):
+    """Return the stored JSON for a store, building it on first use."""
+    document = _read(db.session.connection(), store_id)
+    if document is not None:
+        return document
+    db.session.rollback()
+
+    connection = db.session.connection()
+    _lock_store(connection, store_id)
+    document = _read(connection, store_id)
+    if document is None:
+        built = build_document(connection, store_id)
+        if built is None:
+            db.session.rollback()
+            return None
+        stmt = upsert_insert(StoreDocumentModel.__table__, connection).values(
+            store_id=store_id, document=_encode(built)
+        )
+        connection.execute(stmt.on_conflict_do_nothing(index_elements=[StoreDocumentModel.store_id]))
+        document = _read(connection, store_id)
+    db.session.commit()
+    return document
+
+
+def _patch(entries, rows, removed, schema):
+    by_id = {entry["id"]: entry for entry in entries if entry["id"] not in removed}
+    by_id.update((row["id"], schema.dump(row)) for row in rows)
+    return [by_id[key] for key in sorted(by_id)]
+
+
+def apply_store_changes(connection, changes):
+    """Patch the documents of the stores touched by change log rows.
+
+    Runs on the connection of the write itself, so documents commit together
+    with the change. Stores without a document are left to be built on read.
+    """
+    by_store = {}
+    for change in changes:
+        if change["store_id"] is not None:
+            by_store.setdefault(change["store_id"], []).append(change)
+
+    for store_id, store_changes in by_store.items():
+        if any(c["entity"] == "store" and c["action"] == "delete" for c in store_changes):
+            connection.execute(
+                db.delete(StoreDocumentModel).where(StoreDocumentModel.store_id == store_id)
+            )
+            continue
+
+        _lock_store(connection, store_id)
+        encoded = _read(connection, store_id)
+        if encoded is None:
+            continue
+        document = json.loads(encoded)
+
+        item_ids, removed_items, tag_ids, removed_tags = set(), set(), set(), set()
+        for change in store_changes:
+            if change["entity"] == "item":
+                (removed_items if change["action"] == "delete" else item_ids).add(change["entity_id"])
+            elif change["entity"] == "tag":
+                (removed_tags if change["action"] == "delete" else tag_ids).add(change["entity_id"])
+            elif change["entity"] == "tag_item":
+                tag_ids.add(change["related_id"])
+            elif change["entity"] == "store":
+                document["name"] = connection.execute(
+                    db.select(StoreModel.name).where(StoreModel.id == store_id)
+                ).scalar()
+
+        if removed_items:
+            # Deleting an item drops its links, which changes tag counts.
+            tag_ids.update(tag["id"] for tag in document["tags"])
+        tag_ids -= removed_tags
+        item_ids -= removed_items
+
+        items = connection.execute(
+            db.select(*_ITEM_COLUMNS).where(ItemModel.id.in_(item_ids))
+        ).mappings().all() if item_ids else []
+        tags = connection.execute(
+            db.select(*_TAG_COLUMNS).where(TagModel.id.in_(tag_ids))
+        ).mappings().all() if tag_ids else []
+
+        document["items"] = _patch(document["items"], items, removed_items, PlainItemSchema())
+        document["tags"] = _patch(document["tags"], tags, removed_tags, PlainTagSchema())
+        _save(connection, store_id, document)
+
+
+@click.command("rebuild-store-documents")
+@click.option("--store-id", type=int, help="Only rebuild this store.")
+@with_appcontext
+def rebuild_store_documents_command(store_id):
+    """Rebuild the precomputed store documents from the catalog tables."""
+    store_ids = [store_id] if store_id is not None else db.session.scalars(db.select(StoreModel.id)).all()
+    connection = db.session.connection()
+    for current in store_ids:
+        _lock_store(connection, current)
+        document = build_document(connection, current)
+        if document is None:
+            connection.execute(
+                db.delete(StoreDocumentModel).where(StoreDocumentModel.store_id == current)
+            )
+        else:
+            _save(connection, current, document)
+    db.session.commit()
+    click.echo(f"Rebuilt {len(store_ids)} store document(s).")